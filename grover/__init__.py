@@ -8,19 +8,25 @@ diretamente em hardware quântico real da IBM Quantum.
 __version__ = "1.0.0"
 __author__ = "Grover QPU Implementation"
 
-from grover.circuits import build_grover_2bit_circuit
-from grover.utils import (
-    load_ibm_credentials,
-    get_qiskit_service,
-    list_available_qpus,
-    select_best_qpu
-)
+import importlib
 
-__all__ = [
-    'build_grover_2bit_circuit',
-    'load_ibm_credentials',
-    'get_qiskit_service',
-    'list_available_qpus',
-    'select_best_qpu'
-]
+# Os submódulos dependem de qiskit/qiskit_ibm_runtime, cuja importação é lenta:
+# cada símbolo é importado apenas no primeiro acesso (PEP 562)
+_LAZY_EXPORTS = {
+    'build_grover_2bit_circuit': 'grover.circuits',
+    'build_grover_2bit_native': 'grover.circuits',
+    'load_ibm_credentials': 'grover.utils',
+    'get_qiskit_service': 'grover.utils',
+    'list_available_qpus': 'grover.utils',
+    'select_best_qpu': 'grover.utils'
+}
 
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
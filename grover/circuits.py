@@ -5,10 +5,14 @@ Este módulo constrói o circuito quântico de Grover para buscar
 a senha correta em um espaço de 2 qubits (4 possibilidades).
 """
 
+from collections import Counter
+from math import pi
+from typing import List
+
 from qiskit import QuantumCircuit
 
 
-def build_grover_2bit_circuit() -> QuantumCircuit:
+def build_grover_2bit_circuit(pedagogical: bool = False) -> QuantumCircuit:
     """
     Constrói o circuito do algoritmo de Grover para buscar a senha |11⟩
     em um espaço de busca de 2 qubits.
@@ -22,6 +26,13 @@ def build_grover_2bit_circuit() -> QuantumCircuit:
     Para N=4 (2 qubits), apenas 1 iteração de Grover é necessária,
     pois π/4 * √4 ≈ 1.57 ≈ 1 iteração.
     
+    Por padrão o difusor é emitido na forma simplificada H⊗H · Z⊗Z · CZ · H⊗H,
+    que é o mesmo operador (a menos de fase global) da forma didática
+    H → X → (H-CX-H) → X → H, com 4 portas a menos.
+    
+    Args:
+        pedagogical: Se True, emite o difusor na forma didática passo a passo
+    
     Returns:
         QuantumCircuit: Circuito quântico de Grover pronto para execução
     
@@ -55,6 +66,16 @@ def build_grover_2bit_circuit() -> QuantumCircuit:
     # O difusor amplifica a amplitude do estado marcado
     # Implementação: H → X → Multi-controlled-Z → X → H
     
+    if not pedagogical:
+        # Forma simplificada: X⊗X · CZ · X⊗X = -(Z⊗Z · CZ)
+        qc.h([0, 1])
+        qc.z([0, 1])
+        qc.cz(0, 1)
+        qc.h([0, 1])
+        qc.barrier(label='Difusor')
+        qc.measure_all()
+        return qc
+    
     # 3.1: Aplicar Hadamard
     qc.h([0, 1])
     
@@ -83,6 +104,115 @@ def build_grover_2bit_circuit() -> QuantumCircuit:
     return qc
 
 
+def _select_best_qubit_pair(backend, two_qubit_gate: str) -> List[int]:
+    """
+    Seleciona o par de qubits físicos com menor erro de porta de 2 qubits
+
+    Args:
+        backend: Backend QPU de destino
+        two_qubit_gate: Nome da porta nativa de 2 qubits ('ecr', 'cz' ou 'cx')
+
+    Returns:
+        List[int]: Par [controle, alvo] na direção nativa do coupling map
+    """
+    coupling_map = backend.configuration().coupling_map or [[0, 1]]
+    properties = backend.properties()
+
+    if properties is None:
+        return list(coupling_map[0])
+
+    def edge_error(edge):
+        try:
+            return properties.gate_error(two_qubit_gate, list(edge))
+        except Exception:
+            return 1.0
+
+    return list(min(coupling_map, key=edge_error))
+
+
+def _append_native_h(qc: QuantumCircuit, qubit: int) -> None:
+    """Hadamard em portas nativas: H ≅ RZ(π/2) · SX · RZ(π/2)"""
+    qc.rz(pi / 2, qubit)
+    qc.sx(qubit)
+    qc.rz(pi / 2, qubit)
+
+
+def _append_native_cz(qc: QuantumCircuit, two_qubit_gate: str) -> None:
+    """CZ(0, 1) expresso com a porta nativa de 2 qubits do backend"""
+    if two_qubit_gate == 'cz':
+        qc.cz(0, 1)
+    elif two_qubit_gate == 'ecr':
+        # CZ ≅ (I⊗H) · CX · (I⊗H), com o CX decomposto em ECR
+        qc.sx(1)
+        qc.rz(pi / 2, 1)
+        qc.ecr(0, 1)
+        qc.x(0)
+        qc.rz(-pi / 2, 0)
+        qc.rz(pi / 2, 1)
+        qc.sx(1)
+        qc.rz(pi / 2, 1)
+    else:
+        _append_native_h(qc, 1)
+        qc.cx(0, 1)
+        _append_native_h(qc, 1)
+
+
+def build_grover_2bit_native(backend) -> QuantumCircuit:
+    """
+    Constrói o circuito de Grover de 2 qubits já expresso nas portas nativas
+    do backend (rz, sx, x + ecr/cz/cx), dispensando os passes de otimização
+    do transpilador.
+
+    O difusor H-X-(H-CX-H)-X-H é simplificado algebricamente: X⊗X · CZ · X⊗X
+    equivale a Z⊗Z · CZ (a menos de fase global), e Z⊗Z vira RZ(π) virtual.
+
+    O par de qubits físicos com menor erro de porta de 2 qubits é gravado em
+    circuit.metadata['initial_layout'] para uso em transpile(optimization_level=0).
+
+    Args:
+        backend: Backend QPU de destino
+
+    Returns:
+        QuantumCircuit: Circuito de Grover em portas nativas
+
+    Raises:
+        ValueError: Se o backend não tiver porta nativa de 2 qubits suportada
+    """
+    basis_gates = backend.configuration().basis_gates
+
+    for two_qubit_gate in ('ecr', 'cz', 'cx'):
+        if two_qubit_gate in basis_gates:
+            break
+    else:
+        raise ValueError(
+            f"Backend {backend.name} sem porta nativa de 2 qubits suportada "
+            f"(basis gates: {basis_gates})"
+        )
+
+    qc = QuantumCircuit(2, name='Grover_2bit_native')
+
+    # Superposição inicial
+    _append_native_h(qc, 0)
+    _append_native_h(qc, 1)
+
+    # Oracle |11⟩
+    _append_native_cz(qc, two_qubit_gate)
+
+    # Difusor simplificado: H⊗H · Z⊗Z · CZ · H⊗H
+    _append_native_h(qc, 0)
+    _append_native_h(qc, 1)
+    qc.rz(pi, [0, 1])
+    _append_native_cz(qc, two_qubit_gate)
+    _append_native_h(qc, 0)
+    _append_native_h(qc, 1)
+
+    qc.measure_all()
+
+    qc.metadata = {'initial_layout': _select_best_qubit_pair(backend, two_qubit_gate)}
+
+    return qc
+
+
 def print_circuit_info(circuit: QuantumCircuit) -> None:
     """
     Imprime informações sobre o circuito Grover
@@ -98,10 +228,7 @@ def print_circuit_info(circuit: QuantumCircuit) -> None:
     print(f"Número de operações: {len(circuit.data)}")
     
     # Contar tipos de gates
-    gate_counts = {}
-    for instruction in circuit.data:
-        gate_name = instruction.operation.name
-        gate_counts[gate_name] = gate_counts.get(gate_name, 0) + 1
+    gate_counts = Counter(instruction.operation.name for instruction in circuit.data)
     
     print("\nGates utilizados:")
     for gate, count in sorted(gate_counts.items()):
@@ -114,7 +241,7 @@ def visualize_circuit() -> None:
     """
     Cria e visualiza o circuito Grover (modo texto)
     """
-    circuit = build_grover_2bit_circuit()
+    circuit = build_grover_2bit_circuit(pedagogical=True)
     
     print("\n" + "="*60)
     print("CIRCUITO DO ALGORITMO DE GROVER (2 qubits)")
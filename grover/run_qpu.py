@@ -7,41 +7,306 @@ analisa os resultados e compara com o resultado ideal.
 Nota: Otimizado para funcionar com o plano gratuito da IBM Quantum (sem Session).
 """
 
+import argparse
+import functools
+import hashlib
+import io
 import json
 import os
+import sys
+import time
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Tuple
-from qiskit import transpile
+from typing import Dict, Optional, Tuple
+from qiskit import QuantumCircuit, qpy, transpile
+from qiskit.primitives import StatevectorSampler
 from qiskit_ibm_runtime import QiskitRuntimeService, SamplerV2
 
-from grover.circuits import build_grover_2bit_circuit, print_circuit_info
+try:
+    import orjson
+except ImportError:  # opcional: acelera a gravação de resultados grandes
+    orjson = None
+
+from grover.circuits import build_grover_2bit_circuit, build_grover_2bit_native, print_circuit_info
 from grover.utils import get_qiskit_service, select_best_qpu
 
 
+_CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config' / 'backend_names.json'
+
+# Barras do histograma pré-montadas, indexadas pelo comprimento (0 a 50)
+_BARS = ["█" * i + "░" * (50 - i) for i in range(51)]
+
+
+@functools.lru_cache(maxsize=1)
 def load_config() -> Dict:
     """
     Carrega configurações do arquivo backend_names.json
     
+    O arquivo é lido uma única vez por processo; chamadas seguintes retornam
+    o mesmo dicionário (não modifique o resultado).
+    
     Returns:
         Dict: Configurações de execução
     """
-    config_path = Path(__file__).parent.parent / 'config' / 'backend_names.json'
-    
-    with open(config_path, 'r') as f:
+    with open(_CONFIG_PATH, 'r') as f:
         config = json.load(f)
     
+    # Para um circuito fixo de 2 qubits os níveis 2 e 3 não melhoram nada
+    # (não há roteamento nem blocos a consolidar) e só custam tempo de CPU
+    requested_level = config.get('optimization_level', 1)
+    config['optimization_level'] = min(requested_level, 1)
+    
+    if requested_level > 1:
+        print(f"⚠ optimization_level {requested_level} reduzido para 1: "
+              f"níveis maiores não otimizam este circuito de 2 qubits")
+    
     return config
 
 
-def run_grover_on_qpu() -> Tuple[Dict[str, int], str, str]:
+def _get_transpiled(circuit: QuantumCircuit, backend, opt_level: int) -> QuantumCircuit:
+    """
+    Retorna o circuito transpilado para o backend, usando cache em disco (QPY)
+    
+    A chave do cache é um hash SHA-256 do circuito original (serializado em QPY),
+    das basis gates, do coupling map, da versão do backend, da data da última
+    calibração e do optimization level. Qualquer alteração em
+    build_grover_2bit_circuit muda o hash e invalida automaticamente as entradas
+    antigas; uma nova calibração também, pois o layout escolhido pelo nível 1
+    depende dos erros medidos.
+    
+    Args:
+        circuit: Circuito quântico original
+        backend: Backend QPU de destino
+        opt_level: Nível de otimização do transpilador
+    
+    Returns:
+        QuantumCircuit: Circuito transpilado (carregado do cache ou recém-gerado)
+    """
+    cache_dir = Path(__file__).parent.parent / 'results' / 'transpiled_cache'
+    
+    # Serializar o circuito original para compor a chave do cache
+    buffer = io.BytesIO()
+    qpy.dump(circuit, buffer)
+    
+    backend_config = backend.configuration()
+    hasher = hashlib.sha256()
+    hasher.update(buffer.getvalue())
+    hasher.update(json.dumps(backend_config.basis_gates).encode())
+    hasher.update(json.dumps(backend_config.coupling_map).encode())
+    hasher.update(str(backend.version).encode())
+    
+    # Marcador de calibração: expira o cache quando o dispositivo é recalibrado
+    properties = backend.properties()
+    if properties is not None:
+        hasher.update(str(properties.last_update_date).encode())
+    
+    hasher.update(str(opt_level).encode())
+    
+    cache_file = cache_dir / f'{backend.name}_{opt_level}_{hasher.hexdigest()[:16]}.qpy'
+    
+    if cache_file.exists():
+        with open(cache_file, 'rb') as f:
+            print(f"   ✓ Circuito transpilado carregado do cache: {cache_file.name}")
+            return qpy.load(f)[0]
+    
+    t_circuit = transpile(circuit, backend, optimization_level=opt_level)
+    
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_file, 'wb') as f:
+        qpy.dump(t_circuit, f)
+    
+    return t_circuit
+
+
+def _merge_counts(pub_results) -> Dict[str, int]:
+    """
+    Soma as contagens de todos os PUBs de um job (cópias do mesmo circuito)
+    
+    Args:
+        pub_results: Resultado do SamplerV2 (job.result())
+    
+    Returns:
+        Dict: Contagens agregadas de medições
+    """
+    counts = Counter()
+    
+    for pub_result in pub_results:
+        counts.update(pub_result.data.meas.get_counts())
+    
+    return dict(counts)
+
+
+def _status_name(status) -> str:
+    """Normaliza o status do job (enum JobStatus ou string) para o nome"""
+    return getattr(status, 'name', str(status)).upper()
+
+
+def _save_job_circuits(job_id: str, circuit: QuantumCircuit, t_circuit: QuantumCircuit) -> Path:
+    """
+    Salva os circuitos original e transpilado de um job em results/{job_id}.qpy
+    
+    Args:
+        job_id: ID do job
+        circuit: Circuito original
+        t_circuit: Circuito transpilado efetivamente submetido
+    
+    Returns:
+        Path: Caminho do arquivo QPY
+    """
+    results_dir = Path(__file__).parent.parent / 'results'
+    results_dir.mkdir(exist_ok=True)
+    
+    circuits_file = results_dir / f'{job_id}.qpy'
+    
+    with open(circuits_file, 'wb') as f:
+        qpy.dump([circuit, t_circuit], f)
+    
+    return circuits_file
+
+
+def load_job_circuits(job_id: str) -> Optional[Tuple[QuantumCircuit, QuantumCircuit]]:
+    """
+    Carrega os circuitos salvos na submissão de um job, sem reconectar nem transpilar
+    
+    Args:
+        job_id: ID do job
+    
+    Returns:
+        Tuple: (circuit, t_circuit) ou None se o job não tiver circuitos salvos
+    """
+    circuits_file = Path(__file__).parent.parent / 'results' / f'{job_id}.qpy'
+    
+    if not circuits_file.exists():
+        return None
+    
+    with open(circuits_file, 'rb') as f:
+        circuit, t_circuit = qpy.load(f)
+    
+    return circuit, t_circuit
+
+
+def _record_pending_job(job_id: str, backend_name: str) -> Path:
+    """
+    Registra um job submetido em results/pending_jobs.json
+    
+    Args:
+        job_id: ID do job
+        backend_name: Nome do backend
+    
+    Returns:
+        Path: Caminho do arquivo de jobs pendentes
+    """
+    results_dir = Path(__file__).parent.parent / 'results'
+    results_dir.mkdir(exist_ok=True)
+    
+    pending_file = results_dir / 'pending_jobs.json'
+    pending = json.loads(pending_file.read_text()) if pending_file.exists() else {}
+    pending[job_id] = {'backend': backend_name, 'submitted_at': time.time()}
+    
+    with open(pending_file, 'w') as f:
+        json.dump(pending, f, indent=2)
+    
+    return pending_file
+
+
+def _pop_pending_job(job_id: str) -> Optional[Dict]:
+    """
+    Remove um job de results/pending_jobs.json
+    
+    Args:
+        job_id: ID do job
+    
+    Returns:
+        Dict: Dados registrados na submissão (None se o job não estava registrado)
+    """
+    pending_file = Path(__file__).parent.parent / 'results' / 'pending_jobs.json'
+    
+    if not pending_file.exists():
+        return None
+    
+    pending = json.loads(pending_file.read_text())
+    entry = pending.pop(job_id, None)
+    
+    with open(pending_file, 'w') as f:
+        json.dump(pending, f, indent=2)
+    
+    return entry
+
+
+def _job_failure(job, job_id: str, status: str) -> RuntimeError:
+    """
+    Remove o job de results/pending_jobs.json e monta o erro com o motivo da falha
+    
+    Args:
+        job: Job do Qiskit Runtime em estado ERROR ou CANCELLED
+        job_id: ID do job
+        status: Status final do job
+    
+    Returns:
+        RuntimeError: Erro com a mensagem reportada pelo backend (se houver)
+    """
+    _pop_pending_job(job_id)
+    
+    if hasattr(job, 'error_message'):
+        reason = job.error_message()
+    else:
+        # Jobs locais não têm error_message: o motivo vem da exceção de result()
+        try:
+            job.result()
+            reason = None
+        except Exception as e:
+            reason = f"{type(e).__name__}: {e}"
+    
+    message = f"Job {job_id} terminou com status {status}"
+    if reason:
+        message += f": {reason}"
+    
+    return RuntimeError(message)
+
+
+def wait_with_backoff(job, initial: float = 2.0, max_delay: float = 60.0) -> str:
+    """
+    Aguarda o job terminar consultando job.status() com backoff exponencial
+    
+    Args:
+        job: Job do Qiskit Runtime
+        initial: Intervalo inicial entre consultas (segundos)
+        max_delay: Intervalo máximo entre consultas (segundos)
+    
+    Returns:
+        str: Status final do job ('DONE', 'ERROR' ou 'CANCELLED')
+    """
+    delay = initial
+    
+    while True:
+        status = _status_name(job.status())
+        
+        if status in ('DONE', 'ERROR', 'CANCELLED'):
+            return status
+        
+        print(f"   Status: {status} (nova consulta em {delay:.0f}s)")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def run_grover_on_qpu(
+    wait: bool = True,
+    service: Optional[QiskitRuntimeService] = None
+) -> Tuple[Optional[Dict[str, int]], str, str, QiskitRuntimeService]:
     """
     Executa o algoritmo de Grover em um QPU real da IBM
     
+    Args:
+        wait: Se False, apenas submete o job, registra o job_id em
+            results/pending_jobs.json e retorna sem aguardar o resultado
+        service: Serviço Qiskit (opcional, será criado se não fornecido)
+    
     Returns:
-        Tuple: (counts, job_id, backend_name)
-            - counts: Dicionário com contagens de medições
+        Tuple: (counts, job_id, backend_name, service)
+            - counts: Dicionário com contagens de medições (None se wait=False)
             - job_id: ID do job para referência
             - backend_name: Nome do backend QPU usado
+            - service: Serviço usado, para reaproveitar em retrieve_job
     
     Raises:
         Exception: Se houver erro na execução
@@ -54,33 +319,63 @@ def run_grover_on_qpu() -> Tuple[Dict[str, int], str, str]:
     print("📋 Carregando configurações...")
     config = load_config()
     print(f"   Shots: {config['shots']}")
-    print(f"   Optimization level: {config['optimization_level']}")
+    print(f"   Circuitos por job: {config.get('num_circuits', 1)}")
+    if config.get('native_circuit', False):
+        print(f"   Optimization level: 0 (circuito nativo, layout explícito)")
+    else:
+        print(f"   Optimization level: {config['optimization_level']}")
     print(f"   QPUs preferidos: {', '.join(config['preferred_qpus'])}\n")
     
     # 2. Conectar ao IBM Quantum
     print("🔌 Conectando ao IBM Quantum...")
-    service = get_qiskit_service()
+    if service is None:
+        service = get_qiskit_service()
     
     # 3. Selecionar melhor QPU disponível
     print("🔍 Selecionando melhor QPU disponível...")
     backend = select_best_qpu(
         service, 
         config['preferred_qpus'],
-        min_qubits=2
+        min_qubits=2,
+        pinned_backend=config.get('pinned_backend')
     )
     
     # 4. Construir circuito
     print("🔧 Construindo circuito de Grover...")
-    circuit = build_grover_2bit_circuit()
+    if config.get('native_circuit', False):
+        circuit = build_grover_2bit_native(backend)
+    else:
+        circuit = build_grover_2bit_circuit()
     print_circuit_info(circuit)
     
+    # Preflight: simular exatamente o circuito que será submetido
+    if config.get('preflight_simulator', True):
+        _, fidelity = run_on_simulator(circuit)
+        
+        if fidelity < 0.99:
+            raise RuntimeError(
+                "Preflight falhou: o circuito não amplifica o estado alvo. "
+                "Execução no QPU cancelada."
+            )
+    
     # 5. Transpilar para o backend
     print(f"⚙️  Transpilando circuito para {backend.name}...")
-    t_circuit = transpile(
-        circuit, 
-        backend, 
-        optimization_level=config['optimization_level']
-    )
+    if config.get('native_circuit', False):
+        # Circuito já está nas portas nativas: apenas aplicar o layout físico
+        initial_layout = circuit.metadata['initial_layout']
+        print(f"   Layout físico: qubits {initial_layout}")
+        t_circuit = transpile(
+            circuit,
+            backend,
+            optimization_level=0,
+            initial_layout=initial_layout
+        )
+    else:
+        t_circuit = _get_transpiled(
+            circuit, 
+            backend, 
+            config['optimization_level']
+        )
     print(f"   Circuito transpilado:")
     print(f"   - Profundidade: {t_circuit.depth()}")
     print(f"   - Operações: {len(t_circuit.data)}\n")
@@ -90,25 +385,53 @@ def run_grover_on_qpu() -> Tuple[Dict[str, int], str, str]:
     print(f"   Aguarde: o tempo de fila pode variar de minutos a horas...")
     print(f"   Você pode fechar este programa - use o Job ID para recuperar resultados.\n")
     
-    # Criar sampler diretamente com o backend (sem Session para plano gratuito)
-    sampler = SamplerV2(backend)
-    job = sampler.run([t_circuit], shots=config['shots'])
+    # Criar sampler diretamente com o backend (sem Session para plano gratuito).
+    # O circuito já está transpilado (ISA): desligar as etapas extras do lado
+    # do servidor, desnecessárias para 4 resultados bem distinguíveis
+    sampler = SamplerV2(backend, options={
+        'default_shots': config['shots'],
+        'dynamical_decoupling': {'enable': False},
+        'twirling': {'enable_gates': False, 'enable_measure': False}
+    })
+    # Várias cópias do circuito no mesmo job: mais estatística para uma única fila
+    circuits = [t_circuit] * config.get('num_circuits', 1)
+    job = sampler.run(circuits)
     
     job_id = job.job_id()
+    # Registrar o job antes de qualquer outra escrita: sem isso, --fetch não o encontra
+    pending_file = _record_pending_job(job_id, backend.name)
+    
     print(f"✓ Job submetido com sucesso!")
     print(f"   Job ID: {job_id}")
     print(f"   Backend: {backend.name}\n")
     
+    # Salvar os circuitos é opcional: uma falha aqui não deve interromper a execução
+    try:
+        circuits_file = _save_job_circuits(job_id, circuit, t_circuit)
+        print(f"💾 Circuitos salvos em: {circuits_file}")
+    except Exception as e:
+        print(f"⚠ Não foi possível salvar os circuitos do job: {e}")
+    
+    if not wait:
+        print(f"💾 Job registrado em: {pending_file}")
+        print(f"   Use --fetch {job_id} para recuperar os resultados.\n")
+        return None, job_id, backend.name, service
+    
     print("⏳ Aguardando execução no QPU...")
     print("   (Pressione Ctrl+C para cancelar a espera, o job continuará rodando)\n")
     
     try:
-        result = job.result()[0]
-        counts = result.data.meas.get_counts()
+        status = wait_with_backoff(job)
+        
+        if status != 'DONE':
+            raise _job_failure(job, job_id, status)
+        
+        counts = _merge_counts(job.result())
+        _pop_pending_job(job_id)
         
         print("✓ Execução concluída com sucesso!\n")
         
-        return counts, job_id, backend.name
+        return counts, job_id, backend.name, service
         
     except KeyboardInterrupt:
         print("\n⚠ Espera cancelada pelo usuário.")
@@ -120,6 +443,40 @@ def run_grover_on_qpu() -> Tuple[Dict[str, int], str, str]:
         raise
 
 
+def run_on_simulator(
+    circuit: Optional[QuantumCircuit] = None,
+    expected_state: str = '11'
+) -> Tuple[Dict[str, int], float]:
+    """
+    Executa o circuito de Grover em simulador local (preflight)
+    
+    Valida o circuito em milissegundos, sem consumir cota nem tempo de fila
+    do QPU. O resultado ideal é o estado alvo com fidelidade 1.0.
+    
+    Args:
+        circuit: Circuito a simular (padrão: build_grover_2bit_circuit())
+        expected_state: Estado esperado (padrão: '11')
+    
+    Returns:
+        Tuple: (counts, fidelity)
+            - counts: Dicionário com contagens de medições
+            - fidelity: Probabilidade do estado esperado
+    """
+    config = load_config()
+    
+    if circuit is None:
+        circuit = build_grover_2bit_circuit()
+    
+    print("🧪 Preflight: executando o circuito em simulador local...")
+    result = StatevectorSampler().run([circuit], shots=config['shots']).result()
+    counts = _merge_counts(result)
+    fidelity = counts.get(expected_state, 0) / sum(counts.values())
+    
+    print(f"   Fidelidade no simulador: {fidelity*100:.2f}% (ideal: 100%)\n")
+    
+    return counts, fidelity
+
+
 def analyze_results(counts: Dict[str, int], backend_name: str, expected_state: str = '11') -> float:
     """
     Analisa os resultados da execução no QPU
@@ -132,7 +489,8 @@ def analyze_results(counts: Dict[str, int], backend_name: str, expected_state: s
     Returns:
         float: Fidelidade (probabilidade do estado correto)
     """
-    total_shots = sum(counts.values())
+    counts = Counter(counts)
+    total_shots = counts.total()
     
     print("="*70)
     print("ANÁLISE DE RESULTADOS")
@@ -148,13 +506,17 @@ def analyze_results(counts: Dict[str, int], backend_name: str, expected_state: s
     # Distribuição de resultados
     print("📊 Distribuição de resultados (ordenado por frequência):\n")
     
-    for state, count in sorted(counts.items(), key=lambda x: x[1], reverse=True):
+    # Saída acumulada em memória e escrita em um único write
+    output = io.StringIO()
+    
+    for state, count in counts.most_common():
         prob = count / total_shots
-        bar_length = int(prob * 50)
-        bar = "█" * bar_length + "░" * (50 - bar_length)
+        bar = _BARS[count * 50 // total_shots]
         
         marker = "← ALVO" if state == expected_state else ""
-        print(f"|{state}⟩: {count:4d} ({prob*100:5.2f}%) {bar} {marker}")
+        output.write(f"|{state}⟩: {count:4d} ({prob*100:5.2f}%) {bar} {marker}\n")
+    
+    sys.stdout.write(output.getvalue())
     
     print(f"\n{'='*70}")
     print(f"FIDELIDADE: {fidelity*100:.2f}% (estado |{expected_state}⟩)")
@@ -195,7 +557,10 @@ def retrieve_job(job_id: str, service: QiskitRuntimeService = None) -> Dict[str,
         service: Serviço Qiskit (opcional, será criado se não fornecido)
     
     Returns:
-        Dict: Contagens de medições
+        Dict: Contagens de medições (None se o job ainda não terminou)
+    
+    Raises:
+        RuntimeError: Se o job terminou com ERROR ou CANCELLED
     """
     if service is None:
         service = get_qiskit_service()
@@ -204,17 +569,25 @@ def retrieve_job(job_id: str, service: QiskitRuntimeService = None) -> Dict[str,
     
     try:
         job = service.job(job_id)
-        status = job.status()
+        status = _status_name(job.status())
         
         print(f"   Status: {status}\n")
         
-        if status.name == 'DONE':
-            result = job.result()[0]
-            counts = result.data.meas.get_counts()
+        job_circuits = load_job_circuits(job_id)
+        
+        if job_circuits is not None:
+            t_circuit = job_circuits[1]
+            print(f"   Circuito executado: profundidade {t_circuit.depth()}, "
+                  f"{len(t_circuit.data)} operações\n")
+        
+        if status == 'DONE':
+            counts = _merge_counts(job.result())
             print("✓ Resultados recuperados com sucesso!\n")
             return counts
+        elif status in ('ERROR', 'CANCELLED'):
+            raise _job_failure(job, job_id, status)
         else:
-            print(f"⏳ Job ainda não concluído. Status: {status.name}\n")
+            print(f"⏳ Job ainda não concluído. Status: {status}\n")
             return None
             
     except Exception as e:
@@ -236,6 +609,7 @@ def save_results(counts: Dict[str, int], job_id: str, backend_name: str, fidelit
     results_dir.mkdir(exist_ok=True)
     
     result_file = results_dir / f'grover_result_{job_id}.json'
+    circuits_file = results_dir / f'{job_id}.qpy'
     
     result_data = {
         'job_id': job_id,
@@ -243,11 +617,15 @@ def save_results(counts: Dict[str, int], job_id: str, backend_name: str, fidelit
         'counts': counts,
         'fidelity': fidelity,
         'total_shots': sum(counts.values()),
-        'expected_state': '11'
+        'expected_state': '11',
+        'circuits_file': circuits_file.name if circuits_file.exists() else None
     }
     
-    with open(result_file, 'w') as f:
-        json.dump(result_data, f, indent=2)
+    if orjson is not None:
+        result_file.write_bytes(orjson.dumps(result_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(result_file, 'w') as f:
+            json.dump(result_data, f, indent=2)
     
     print(f"💾 Resultados salvos em: {result_file}\n")
 
@@ -255,10 +633,62 @@ def save_results(counts: Dict[str, int], job_id: str, backend_name: str, fidelit
 def main():
     """
     Função principal - executa o algoritmo de Grover no QPU
+    
+    Uso:
+        python -m grover.run_qpu                  # apenas simulador local
+        python -m grover.run_qpu --qpu            # preflight + QPU, aguarda o resultado
+        python -m grover.run_qpu --submit         # preflight + QPU, apenas submete e sai
+        python -m grover.run_qpu --fetch JOB_ID   # recupera e analisa um job
     """
+    parser = argparse.ArgumentParser(description="Algoritmo de Grover em QPU real da IBM")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--qpu', action='store_true',
+                       help="Executa no QPU real após o preflight no simulador")
+    group.add_argument('--submit', action='store_true',
+                       help="Apenas submete o job e registra o Job ID, sem aguardar")
+    group.add_argument('--fetch', metavar='JOB_ID',
+                       help="Recupera, analisa e salva os resultados de um job submetido")
+    args = parser.parse_args()
+    
+    qpu_requested = args.qpu or args.submit
+    
     try:
-        # Executar no QPU
-        counts, job_id, backend_name = run_grover_on_qpu()
+        # Sem --qpu/--submit/--fetch: apenas o simulador local. Com --qpu/--submit,
+        # o preflight roda dentro de run_grover_on_qpu sobre o circuito submetido
+        if not args.fetch and not qpu_requested:
+            counts, fidelity = run_on_simulator()
+            
+            if fidelity < 0.99:
+                print("✗ Preflight falhou: o circuito não amplifica o estado alvo.\n")
+                return None
+            
+            print("✓ Preflight concluído. Use --qpu para executar no QPU real.\n")
+            return counts, None, fidelity
+        
+        # Um único serviço para todas as chamadas ao IBM Quantum
+        service = get_qiskit_service()
+        
+        if args.submit:
+            run_grover_on_qpu(wait=False, service=service)
+            return None
+        
+        if args.fetch:
+            job_id = args.fetch
+            counts = retrieve_job(job_id, service=service)
+            
+            if counts is None:
+                return None
+            
+            entry = _pop_pending_job(job_id)
+            
+            if entry is not None:
+                backend_name = entry['backend']
+            else:
+                # Job submetido em outra máquina (ou registro apagado): perguntar ao runtime
+                backend_name = service.job(job_id).backend().name
+        else:
+            # Executar no QPU
+            counts, job_id, backend_name, service = run_grover_on_qpu(service=service)
         
         # Analisar resultados
         fidelity = analyze_results(counts, backend_name)
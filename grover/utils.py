@@ -2,12 +2,18 @@
 Funções auxiliares para conexão com IBM Quantum e gerenciamento de backends.
 """
 
+import functools
 import os
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple
 from dotenv import load_dotenv
 from qiskit_ibm_runtime import QiskitRuntimeService
 
 
+# Snapshot de QPUs por serviço: (id(service), min_qubits) -> (service, backends, status)
+_backends_snapshots: Dict[Tuple[int, int], Tuple[QiskitRuntimeService, List, Dict[str, Tuple[int, bool, int]]]] = {}
+
+
 def load_ibm_credentials() -> tuple[str, str]:
     """
     Carrega as credenciais IBM Quantum do arquivo .env
@@ -38,9 +44,10 @@ def load_ibm_credentials() -> tuple[str, str]:
     return api_key, instance
 
 
-def get_qiskit_service() -> QiskitRuntimeService:
+@functools.lru_cache(maxsize=1)
+def _cached_service() -> QiskitRuntimeService:
     """
-    Inicializa e retorna o serviço Qiskit Runtime com as credenciais do .env
+    Inicializa o serviço Qiskit Runtime uma única vez por processo
     
     Returns:
         QiskitRuntimeService: Serviço conectado ao IBM Quantum
@@ -76,6 +83,87 @@ def get_qiskit_service() -> QiskitRuntimeService:
             )
 
 
+def get_qiskit_service() -> QiskitRuntimeService:
+    """
+    Retorna o serviço Qiskit Runtime com as credenciais do .env
+    
+    O serviço é criado apenas na primeira chamada e reutilizado depois.
+    
+    Returns:
+        QiskitRuntimeService: Serviço conectado ao IBM Quantum
+    
+    Raises:
+        ValueError: Se as credenciais não estiverem configuradas
+        Exception: Se houver erro ao conectar com IBM Quantum
+    """
+    return _cached_service()
+
+
+def _cached_backends_snapshot(
+    service: QiskitRuntimeService,
+    min_qubits: int,
+    refresh: bool = False
+) -> Tuple[List, Dict[str, Tuple[int, bool, int]]]:
+    """
+    Captura uma única vez a lista de QPUs do serviço com qubits suficientes
+    
+    A filtragem (hardware real, qubits mínimos) usa apenas a configuração dos
+    backends, sem consultar o status de cada um. O dicionário de status começa
+    vazio e é preenchido sob demanda (em paralelo) por _fetch_statuses, que
+    também informa se cada QPU está operacional.
+    
+    Args:
+        service: Serviço Qiskit Runtime conectado
+        min_qubits: Número mínimo de qubits necessários
+        refresh: Se True, descarta o snapshot e consulta o IBM Quantum novamente
+    
+    Returns:
+        Tuple: (backends, status)
+            - backends: Lista de QPUs com pelo menos min_qubits
+            - status: {nome: (num_qubits, operational, pending_jobs)} já consultados
+    """
+    key = (id(service), min_qubits)
+    cached = _backends_snapshots.get(key)
+    
+    if cached is not None and cached[0] is service and not refresh:
+        return cached[1], cached[2]
+    
+    # Não filtrar por operational aqui: isso faria um status() sequencial por backend
+    backends = list(service.backends(
+        simulator=False,
+        min_num_qubits=min_qubits
+    ))
+    status_by_name = {}
+    
+    _backends_snapshots[key] = (service, backends, status_by_name)
+    
+    return backends, status_by_name
+
+
+def _fetch_statuses(backends: List, status_by_name: Dict[str, Tuple[int, bool, int]]) -> None:
+    """
+    Consulta em paralelo o status dos backends ainda ausentes do snapshot
+    
+    Args:
+        backends: Backends cujo status é necessário
+        status_by_name: Dicionário do snapshot, atualizado in-place
+    """
+    missing = [backend for backend in backends if backend.name not in status_by_name]
+    
+    if not missing:
+        return
+    
+    def fetch(backend):
+        status = backend.status()
+        operational = status.operational if hasattr(status, 'operational') else True
+        pending = status.pending_jobs if hasattr(status, 'pending_jobs') else 0
+        return backend.name, (backend.num_qubits, operational, pending)
+    
+    # Chamadas de rede (I/O): threads evitam esperar cada round-trip em sequência
+    with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+        status_by_name.update(executor.map(fetch, missing))
+
+
 def list_available_qpus(service: QiskitRuntimeService) -> List:
     """
     Lista todos os backends QPU (hardware real) disponíveis
@@ -120,7 +208,9 @@ def list_available_qpus(service: QiskitRuntimeService) -> List:
 def select_best_qpu(
     service: QiskitRuntimeService,
     preferred_qpus: Optional[List[str]] = None,
-    min_qubits: int = 2
+    min_qubits: int = 2,
+    refresh: bool = False,
+    pinned_backend: Optional[str] = None
 ):
     """
     Seleciona o melhor QPU disponível baseado em preferências e fila
@@ -129,6 +219,8 @@ def select_best_qpu(
         service: Serviço Qiskit Runtime conectado
         preferred_qpus: Lista de nomes de QPUs preferidos (em ordem de preferência)
         min_qubits: Número mínimo de qubits necessários
+        refresh: Se True, consulta novamente o status dos QPUs (fila ao vivo)
+        pinned_backend: Nome de QPU fixado; usado diretamente se estiver operacional
     
     Returns:
         Backend: Melhor backend QPU disponível
@@ -136,50 +228,64 @@ def select_best_qpu(
     Raises:
         ValueError: Se nenhum QPU adequado for encontrado
     """
-    # Listar todos os QPUs disponíveis
-    available_qpus = []
+    # QPU fixado: uma única consulta, sem varrer os demais backends
+    if pinned_backend:
+        try:
+            backend = service.backend(pinned_backend)
+            status = backend.status()
+            
+            if status.operational and backend.num_qubits >= min_qubits:
+                print(f"\n✓ Usando QPU fixado: {pinned_backend}")
+                print(f"  Qubits: {backend.num_qubits}")
+                print(f"  Fila: {status.pending_jobs} jobs\n")
+                return backend
+            
+            print(f"⚠ QPU fixado {pinned_backend} indisponível, selecionando outro...")
+        except Exception as e:
+            print(f"⚠ Erro ao acessar QPU fixado {pinned_backend}: {e}")
     
-    for backend in service.backends():
-        # Verificar se é hardware real
-        if hasattr(backend, 'simulator') and not backend.simulator:
-            # Verificar requisitos mínimos
-            if backend.num_qubits >= min_qubits:
-                status = backend.status()
-                operational = status.operational if hasattr(status, 'operational') else True
-                
-                if operational:
-                    pending = status.pending_jobs if hasattr(status, 'pending_jobs') else 0
-                    available_qpus.append({
-                        'backend': backend,
-                        'name': backend.name,
-                        'qubits': backend.num_qubits,
-                        'pending_jobs': pending
-                    })
+    # Listar QPUs com qubits suficientes (snapshot em cache)
+    backends, status_by_name = _cached_backends_snapshot(service, min_qubits, refresh=refresh)
     
-    if not available_qpus:
+    if not backends:
         raise ValueError(
             f"Nenhum QPU operacional encontrado com pelo menos {min_qubits} qubits.\n"
             "Verifique seu acesso em: https://quantum.ibm.com/"
         )
     
-    # Se há QPUs preferidos, tentar usá-los primeiro
+    # Se há QPUs preferidos, consultar o status apenas deles
     if preferred_qpus:
-        for preferred_name in preferred_qpus:
-            for qpu_info in available_qpus:
-                if qpu_info['name'] == preferred_name:
-                    print(f"\n✓ Selecionado QPU preferido: {preferred_name}")
-                    print(f"  Qubits: {qpu_info['qubits']}")
-                    print(f"  Fila: {qpu_info['pending_jobs']} jobs\n")
-                    return qpu_info['backend']
+        backends_by_name = {backend.name: backend for backend in backends}
+        candidates = [backends_by_name[name] for name in preferred_qpus if name in backends_by_name]
+        _fetch_statuses(candidates, status_by_name)
+        
+        for backend in candidates:
+            num_qubits, operational, pending = status_by_name[backend.name]
+            
+            if operational:
+                print(f"\n✓ Selecionado QPU preferido: {backend.name}")
+                print(f"  Qubits: {num_qubits}")
+                print(f"  Fila: {pending} jobs\n")
+                return backend
     
     # Caso contrário, selecionar o com menor fila
-    best_qpu = min(available_qpus, key=lambda x: x['pending_jobs'])
+    _fetch_statuses(backends, status_by_name)
+    available_qpus = [backend for backend in backends if status_by_name[backend.name][1]]
+    
+    if not available_qpus:
+        raise ValueError(
+            f"Nenhum QPU operacional encontrado com pelo menos {min_qubits} qubits.\n"
+            "Verifique seu acesso em: https://quantum.ibm.com/"
+        )
+    
+    best_qpu = min(available_qpus, key=lambda backend: status_by_name[backend.name][2])
+    num_qubits, _, pending = status_by_name[best_qpu.name]
     
-    print(f"\n✓ Selecionado QPU com menor fila: {best_qpu['name']}")
-    print(f"  Qubits: {best_qpu['qubits']}")
-    print(f"  Fila: {best_qpu['pending_jobs']} jobs\n")
+    print(f"\n✓ Selecionado QPU com menor fila: {best_qpu.name}")
+    print(f"  Qubits: {num_qubits}")
+    print(f"  Fila: {pending} jobs\n")
     
-    return best_qpu['backend']
+    return best_qpu
 
 
 def validate_connection() -> bool:
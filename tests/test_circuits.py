@@ -0,0 +1,31 @@
+"""
+Testes de equivalência dos circuitos de Grover.
+"""
+
+import pytest
+from qiskit.quantum_info import Operator
+from qiskit_ibm_runtime.fake_provider import FakeBrisbane, FakeManilaV2, FakeTorino
+
+from grover.circuits import build_grover_2bit_circuit, build_grover_2bit_native
+
+
+def _unitary(circuit):
+    """Operador do circuito sem as medições finais"""
+    circuit = circuit.copy()
+    circuit.remove_final_measurements()
+    return Operator(circuit)
+
+
+def test_simplified_circuit_matches_pedagogical():
+    simplified = build_grover_2bit_circuit()
+    pedagogical = build_grover_2bit_circuit(pedagogical=True)
+
+    assert _unitary(simplified).equiv(_unitary(pedagogical))
+
+
+@pytest.mark.parametrize('fake_backend', [FakeBrisbane, FakeTorino, FakeManilaV2])
+def test_native_circuit_matches_pedagogical(fake_backend):
+    native = build_grover_2bit_native(fake_backend())
+    pedagogical = build_grover_2bit_circuit(pedagogical=True)
+
+    assert _unitary(native).equiv(_unitary(pedagogical))